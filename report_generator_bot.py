@@ -1,28 +1,89 @@
 import streamlit as st
-import openai
-from langchain_openai import ChatOpenAI
+import streamlit.components.v1 as components
+import asyncio
+import copy
+import functools
+import hashlib
+import inspect
+import logging
+import queue
+import re
+import threading
+import time
+import diskcache
+import orjson
 from dotenv import load_dotenv
 import os
-import pyperclip
-from fpdf import FPDF
 from datetime import datetime
 import json
-
-# Additional library for file processing
-import pandas as pd
 from io import BytesIO  # for creating the Excel template in memory
 
+# Heavy libraries (pandas, openpyxl, fpdf, openai, faiss, numpy, tiktoken) are imported inside the
+# functions that use them, so the welcome and questionnaire pages render without paying for them.
+
+# Directory of this script; on-disk resources and caches live next to it, whatever the CWD.
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger(__name__)
+
 # Load environment variables (including your OpenAI API key)
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Model and per-section token limit used for report generation.
+SECTION_MODEL = "gpt-4-turbo"
+SECTION_MAX_TOKENS = 800
+# Output budget when all sections are requested at once (gpt-4-turbo's completion ceiling).
+COMBINED_MAX_TOKENS = 4096
+# Smallest per-section share of that budget worth a single request; with more answered sections
+# than COMBINED_MAX_TOKENS // COMBINED_MIN_SECTION_TOKENS, sections are requested individually.
+COMBINED_MIN_SECTION_TOKENS = 200
+
+# Report generation modes offered in the sidebar.
+MODE_PARALLEL = "Parallel sections"
+MODE_SINGLE_REQUEST = "Single request"
+MODE_BATCH = "Cheap mode (24h turnaround)"
+
+# Maximum number of section requests in flight at once (keeps us under API rate limits).
+MAX_CONCURRENT_SECTIONS = 8
+
+# How often the UI thread drains progress events from the background report worker.
+PROGRESS_POLL_SECONDS = 0.1
+
+# Settings shared by both OpenAI clients. Enough keep-alive connections for a full concurrent
+# report, so section requests reuse open sockets instead of paying a TLS handshake each.
+OPENAI_TIMEOUT_SECONDS = 60
+OPENAI_MAX_RETRIES = 2
+HTTP_MAX_CONNECTIONS = 32
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 16
+
+# Default sampling temperature; the sidebar can switch to 0 for deterministic, cacheable output.
+DEFAULT_TEMPERATURE = 0.7
+
+# Persistent cache of LLM responses, shared across sessions and app restarts (see get_llm_cache).
+LLM_CACHE_DIR = os.path.join(APP_DIR, ".llm_cache")
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Semantic cache: reuse a previously generated section when a new answer is a near-duplicate.
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_CACHE_DIR = os.path.join(APP_DIR, ".semantic_cache")
+SEMANTIC_CACHE_THRESHOLD = 0.92
+# Sections kept per (standard, section); the oldest are evicted first, which bounds each store's rewrite.
+SEMANTIC_CACHE_MAX_ENTRIES = 500
+# Answers that identify the company are never matched against other companies' sections.
+SEMANTIC_CACHE_EXCLUDED_KEYS = {"company_name"}
 
 
 # ------------------------------------------------------------------------------
 # Helper functions to normalize and parse keys from an uploaded Excel file
 # ------------------------------------------------------------------------------
+# Compiled once: everything that is not a lowercase letter or digit is stripped from keys.
+_NON_ALNUM = re.compile(r"[^a-z0-9]")
+
+
 def normalize_key(s):
     """Normalize a key string by lowercasing and keeping only alphanumeric characters."""
-    return ''.join(ch for ch in s.lower() if ch.isalnum())
+    return _NON_ALNUM.sub("", s.lower())
 
 
 # Map normalized keys to our internal questionnaire keys.
@@ -53,6 +114,19 @@ predefined_keys = {
     "riskmanagement": "risk_management"
 }
 
+# Key labels used in the downloadable Excel template.
+TEMPLATE_KEYS = [
+    "Company Name", "Industry", "Overview", "Governance", "Ethics",
+    "Business Model", "Strategy", "Stakeholder Engagement", "Materiality",
+    "Environmental Performance", "Environmental Targets", "Social Performance",
+    "Community Engagement", "Labor Practices", "Human Rights", "Supply Chain",
+    "Supplier Evaluation", "Financial Sustainability", "Reporting Frameworks",
+    "Data Assurance", "KPI", "Future Goals", "Innovation", "Risk Management"
+]
+
+# Template labels resolve straight to internal keys, skipping normalization for the common case.
+RAW_KEY_MAP = {label: predefined_keys[normalize_key(label)] for label in TEMPLATE_KEYS}
+
 
 def parse_uploaded_excel(uploaded_file):
     """
@@ -60,47 +134,97 @@ def parse_uploaded_excel(uploaded_file):
     It expects the file to contain rows in the format:
       Key | Value
     or the first two columns in each row represent "Key" and "Value".
+    XLSX files are streamed row by row with openpyxl in read-only mode.
     """
+    from openpyxl import load_workbook
+
+    result = {}
+    try:
+        if getattr(uploaded_file, "name", "").lower().endswith(".xls"):
+            # openpyxl cannot read the legacy binary format.
+            return _parse_excel_with_pandas(uploaded_file)
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, ())
+            if "Key" in header and "Value" in header:
+                key_col, value_col = header.index("Key"), header.index("Value")
+            else:
+                key_col, value_col = 0, 1
+            for row in rows:
+                if len(row) <= key_col:
+                    continue
+                raw_key = str(row[key_col])
+                # Template labels resolve directly; anything else is normalized first.
+                internal_key = RAW_KEY_MAP.get(raw_key) or predefined_keys.get(normalize_key(raw_key))
+                if internal_key:
+                    value = row[value_col] if len(row) > value_col else None
+                    result[internal_key] = "" if value is None else str(value)
+        finally:
+            workbook.close()
+    except Exception as e:
+        st.error(f"Error processing Excel file: {e}")
+    return result
+
+
+def _parse_excel_with_pandas(uploaded_file):
+    """Parse a legacy XLS upload through pandas, mapping keys with vectorized string operations."""
+    import pandas as pd
+
     result = {}
     try:
         df = pd.read_excel(uploaded_file)
         if 'Key' in df.columns and 'Value' in df.columns:
-            for index, row in df.iterrows():
-                key_candidate = str(row['Key'])
-                value = str(row['Value'])
-                norm = normalize_key(key_candidate)
-                if norm in predefined_keys:
-                    result[predefined_keys[norm]] = value
+            raw_keys, values = df['Key'], df['Value']
+        elif len(df.columns) > 1:
+            raw_keys, values = df.iloc[:, 0], df.iloc[:, 1]
         else:
-            for index, row in df.iterrows():
-                key_candidate = str(row.iloc[0])
-                value = str(row.iloc[1]) if len(row) > 1 else ""
-                norm = normalize_key(key_candidate)
-                if norm in predefined_keys:
-                    result[predefined_keys[norm]] = value
+            raw_keys, values = df.iloc[:, 0], pd.Series("", index=df.index)
+        # Map template labels directly, then normalize only the labels that missed;
+        # unknown keys drop out as NaN.
+        raw_keys = raw_keys.astype(str)
+        mapped = raw_keys.map(RAW_KEY_MAP)
+        misses = mapped.isna()
+        if misses.any():
+            normalized = raw_keys[misses].str.lower().str.replace(_NON_ALNUM, "", regex=True)
+            mapped[misses] = normalized.map(predefined_keys)
+        mapped = mapped.dropna()
+        result = dict(zip(mapped, values.loc[mapped.index].astype(str)))
     except Exception as e:
         st.error(f"Error processing Excel file: {e}")
     return result
 
 
+@st.cache_data(show_spinner=False)
+def build_template_bytes():
+    """
+    Build the blank Excel template in memory.
+    The template never changes, so it is serialized once and reused across reruns and sessions.
+    """
+    import pandas as pd
+
+    template_df = pd.DataFrame({
+        "Key": TEMPLATE_KEYS,
+        "Value": ["" for _ in TEMPLATE_KEYS]
+    })
+    excel_buffer = BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
+        template_df.to_excel(writer, index=False)
+    return excel_buffer.getvalue()
+
+
 # ------------------------------------------------------------------------------
 # Custom CSS for a minimalistic, tech-inspired look
 # ------------------------------------------------------------------------------
-def set_custom_css():
-    st.markdown(
-        """
+# Built once at import. It is still sent on every rerun: Streamlit removes any element a rerun
+# does not emit again, so injecting it only once per session would drop the styles.
+_APP_CSS = """
         <style>
-        .report-container {
-            background-color: #F9FAFB;
-            padding: 2rem;
-            border-radius: 10px;
-            border: 1px solid #E5E7EB;
-        }
         h1, h2, h3, h4 {
             font-family: "Helvetica Neue", sans-serif;
             color: #111827;
         }
-        div.stButton > button {
+        div.stButton > button, div.stFormSubmitButton > button {
             background-color: #33505b !important;
             color: white !important;
             border-radius: 6px !important;
@@ -114,52 +238,106 @@ def set_custom_css():
             border-radius: 6px;
         }
         </style>
+        """
+
+
+def set_custom_css():
+    st.markdown(_APP_CSS, unsafe_allow_html=True)
+
+
+# ------------------------------------------------------------------------------
+# Copy to clipboard in the user's browser (the server's clipboard is not the user's)
+# ------------------------------------------------------------------------------
+def copy_to_clipboard_button(text, label="Copy to Clipboard"):
+    # Escape "</" so report text can never close the script tag early.
+    text_js = json.dumps(text).replace("</", "<\\/")
+    components.html(
+        f"""
+        <button id="copy-button" style="background-color: #33505b; color: white; border: none;
+            border-radius: 6px; font-weight: 600; padding: 0.4rem 0.8rem; cursor: pointer;
+            font-family: 'Source Sans Pro', sans-serif; font-size: 1rem;">{label}</button>
+        <script>
+        const text = {text_js};
+        const button = document.getElementById("copy-button");
+        button.addEventListener("click", async () => {{
+            try {{
+                await navigator.clipboard.writeText(text);
+            }} catch (err) {{
+                // Fallback for browsers that block the async clipboard API inside iframes.
+                const area = document.createElement("textarea");
+                area.value = text;
+                document.body.appendChild(area);
+                area.select();
+                document.execCommand("copy");
+                area.remove();
+            }}
+            button.innerText = "Copied!";
+        }});
+        </script>
         """,
-        unsafe_allow_html=True
+        height=50,
     )
 
 
 # ------------------------------------------------------------------------------
 # Custom PDF class for nice formatting with header, footer, margins, and A4 format
 # ------------------------------------------------------------------------------
-class PDF(FPDF):
+FONTS_DIR = os.path.join(APP_DIR, "fonts")
+PDF_FONT = "DejaVu"
 
-    def __init__(self, orientation='P', unit='mm', format='A4'):
-        super().__init__(orientation, unit, format)
-        self.set_margins(20, 20, 20)
 
-    def header(self):
-        current_year = datetime.now().year
-        self.set_font("Times", "B", 12)
-        self.set_text_color(50, 50, 50)
-        self.cell(0, 10, f"{current_year} Sustainability Report", ln=True, align="C")
-        self.ln(5)
+@st.cache_resource(show_spinner=False)
+def _pdf_class():
+    """
+    Define the PDF layout class on first use, so fpdf is only imported once a PDF is built.
+    Held by st.cache_resource so the class is defined once per process, not once per rerun.
+    """
+    from fpdf import FPDF
+
+    class PDF(FPDF):
+
+        def __init__(self, orientation='P', unit='mm', format='A4'):
+            super().__init__(orientation, unit, format)
+            self.set_margins(20, 20, 20)
+            # Embedded Unicode font, so report text is rendered as-is without latin-1 workarounds.
+            self.add_font(PDF_FONT, "", os.path.join(FONTS_DIR, "DejaVuSerif.ttf"))
+            self.add_font(PDF_FONT, "B", os.path.join(FONTS_DIR, "DejaVuSerif-Bold.ttf"))
 
-    def footer(self):
-        self.set_y(-15)
-        self.set_font("Times", "I", 8)
-        self.set_text_color(100, 100, 100)
-        self.cell(0, 10, f"Page {self.page_no()}", 0, 0, "C")
+        def header(self):
+            current_year = datetime.now().year
+            self.set_font(PDF_FONT, "B", 12)
+            self.set_text_color(50, 50, 50)
+            self.cell(0, 10, f"{current_year} Sustainability Report", ln=True, align="C")
+            self.ln(5)
+
+        def footer(self):
+            self.set_y(-15)
+            # The page number is plain ASCII, so the core italic face is enough here.
+            self.set_font("Times", "I", 8)
+            self.set_text_color(100, 100, 100)
+            self.cell(0, 10, f"Page {self.page_no()}", 0, 0, "C")
+
+    return PDF
 
 
 def create_pdf(report_text, company_name, standard):
-    pdf = PDF()
+    pdf = _pdf_class()()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=20)
     current_year = datetime.now().year
-    pdf.set_font("Times", "B", 16)
+    pdf.set_font(PDF_FONT, "B", 16)
     pdf.set_text_color(0, 0, 128)
     title_text = f"{current_year} - {company_name} - {standard} Report"
     pdf.cell(0, 10, title_text, ln=True, align="C")
     pdf.ln(5)
-    pdf.set_font("Times", "", 12)
+    pdf.set_font(PDF_FONT, "", 12)
     pdf.set_text_color(0, 0, 0)
     pdf.cell(0, 10, f"Date: {datetime.now().strftime('%B %d, %Y')}", ln=True, align="C")
     pdf.ln(10)
     pdf.set_line_width(0.5)
     pdf.line(20, pdf.get_y(), 190, pdf.get_y())
     pdf.ln(10)
-    pdf.set_font("Times", "", 12)
+    pdf.set_font(PDF_FONT, "", 12)
     for line in report_text.split("\n"):
         line_stripped = line.strip()
         if not line_stripped:
@@ -169,237 +347,931 @@ def create_pdf(report_text, company_name, standard):
             heading_level = len(line_stripped) - len(line_stripped.lstrip("#"))
             heading_text = line_stripped.lstrip("#").strip()
             if heading_level == 1:
-                pdf.set_font("Times", "B", 16)
+                pdf.set_font(PDF_FONT, "B", 16)
             elif heading_level == 2:
-                pdf.set_font("Times", "B", 14)
+                pdf.set_font(PDF_FONT, "B", 14)
             else:
-                pdf.set_font("Times", "B", 12)
+                pdf.set_font(PDF_FONT, "B", 12)
             pdf.cell(0, 10, heading_text, ln=True)
             pdf.ln(2)
-            pdf.set_font("Times", "", 12)
+            pdf.set_font(PDF_FONT, "", 12)
         else:
             line_clean = line_stripped.replace("**", "")
             pdf.multi_cell(0, 10, line_clean)
             pdf.ln(2)
-    for key in list(pdf.pages.keys()):
-        pdf.pages[key] = (
-            pdf.pages[key]
-            .replace('\u2013', '-')
-            .replace('\u2014', '-')
-            .replace('\u2019', "'")
-        )
-    pdf_bytes = pdf.output(dest="S").encode("latin1", errors="replace")
-    return pdf_bytes
+    return bytes(pdf.output())
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _cached_pdf(report_text, company_name, standard):
+    """
+    Render the PDF once per distinct (report, company, standard); reruns reuse the bytes.
+    Bounded to a few entries since each one holds a whole PDF in memory.
+    """
+    return create_pdf(report_text, company_name, standard)
 
 
 # ------------------------------------------------------------------------------
-# New functions to generate report sections individually with a progress bar
+# Prompt templates per reporting standard, built once at import
 # ------------------------------------------------------------------------------
-def generate_section(section_key, question_text, answer, standard):
+SECTION_PROMPTS = {
+    "CSRD": (
+        "You are a professional sustainability consultant. "
+        "Based on the provided answer, generate a detailed CSRD-compliant report section."
+    ),
+    "GRI": (
+        "You are a professional sustainability consultant. "
+        "Based on the provided answer, generate a detailed GRI-compliant report section."
+    ),
+    "TCFD": (
+        "You are a professional sustainability consultant. "
+        "Based on the provided answer, generate a detailed TCFD-aligned report section."
+    ),
+    "SASB": (
+        "You are a professional sustainability consultant. "
+        "Based on the provided answer, generate a detailed SASB-compliant report section."
+    ),
+    "Integrated Reporting (<IR>)": (
+        "You are a professional sustainability consultant. "
+        "Based on the provided answer, generate a detailed Integrated Reporting (<IR>)-compliant report section."
+    ),
+    "CDP": (
+        "You are a professional sustainability consultant. "
+        "Based on the provided answer, generate a detailed CDP-compliant report section focused on environmental transparency."
+    ),
+    "AA1000": (
+        "You are a professional sustainability consultant. "
+        "Based on the provided answer, generate a detailed AA1000-compliant report section emphasizing stakeholder engagement and accountability."
+    ),
+    "ISO 26000": (
+        "You are a professional sustainability consultant. "
+        "Based on the provided answer, generate a detailed report section aligned with ISO 26000 guidance on social responsibility."
+    ),
+    "ISSB": (
+        "You are a professional sustainability consultant. "
+        "Based on the provided answer, generate a detailed ISSB-compliant report section addressing both climate-related and general sustainability disclosures."
+    ),
+    "ESRS": (
+        "You are a professional sustainability consultant. "
+        "Based on the provided answer, generate a detailed ESRS-compliant report section covering environmental, social, and governance disclosures."
+    ),
+}
+DEFAULT_SECTION_PROMPT = (
+    "You are a professional sustainability consultant. "
+    "Based on the provided answer, generate a detailed report section."
+)
+
+# Compliance templates receive the report text through the {report} placeholder.
+COMPLIANCE_PROMPTS = {
+    "CSRD": (
+        "You are an expert in sustainability reporting with extensive knowledge of the CSRD standard. "
+        "Evaluate the compliance of the following report with the CSRD standard and provide your evaluation "
+        "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
+        "'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+    ),
+    "GRI": (
+        "You are an expert in sustainability reporting with extensive knowledge of the GRI standards. "
+        "Evaluate the compliance of the following report with the GRI standards and provide your evaluation "
+        "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
+        "'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+    ),
+    "TCFD": (
+        "You are an expert in sustainability reporting with extensive knowledge of the TCFD recommendations. "
+        "Evaluate the compliance of the following report with the TCFD recommendations and provide your evaluation "
+        "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
+        "'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+    ),
+    "SASB": (
+        "You are an expert in sustainability reporting with extensive knowledge of SASB standards. "
+        "Evaluate the compliance of the following report with SASB standards and provide your evaluation "
+        "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
+        "'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+    ),
+    "Integrated Reporting (<IR>)": (
+        "You are an expert in sustainability reporting with extensive knowledge of Integrated Reporting (<IR>) guidelines. "
+        "Evaluate the compliance of the following report with Integrated Reporting guidelines and provide your evaluation "
+        "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
+        "'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+    ),
+    "CDP": (
+        "You are an expert in sustainability reporting with extensive knowledge of CDP requirements. "
+        "Evaluate the compliance of the following report with CDP guidelines and provide your evaluation "
+        "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
+        "'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+    ),
+    "AA1000": (
+        "You are an expert in sustainability reporting with extensive knowledge of AA1000 standards. "
+        "Evaluate the compliance of the following report with AA1000 principles and provide your evaluation "
+        "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
+        "'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+    ),
+    "ISO 26000": (
+        "You are an expert in sustainability reporting with extensive knowledge of ISO 26000 guidance. "
+        "Evaluate the compliance of the following report with ISO 26000 principles on social responsibility and provide your evaluation "
+        "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
+        "'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+    ),
+    "ISSB": (
+        "You are an expert in sustainability reporting with extensive knowledge of ISSB guidelines. "
+        "Evaluate the compliance of the following report with ISSB standards and provide your evaluation "
+        "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
+        "'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+    ),
+    "ESRS": (
+        "You are an expert in sustainability reporting with extensive knowledge of the European Sustainability Reporting Standards (ESRS). "
+        "Evaluate the compliance of the following report with ESRS and provide your evaluation "
+        "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
+        "'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+    ),
+}
+DEFAULT_COMPLIANCE_PROMPT = (
+    "You are an expert in sustainability reporting. "
+    "Evaluate the compliance of the following report with the relevant sustainability reporting standards "
+    "and provide your evaluation in a JSON format with the following keys: 'score' (a number between 1 and 100), "
+    "'strengths', 'weaknesses', and 'recommendations'. Here is the report:\n\n{report}"
+)
+
+
+# ------------------------------------------------------------------------------
+# Exact-match cache for LLM completions
+# ------------------------------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def get_llm_cache():
     """
-    Generate a report section for a specific question and answer.
-    Uses a per-section token limit.
+    Open the on-disk response cache once per process. Streamlit re-executes this script on every
+    rerun, so a module-level Cache would open a new SQLite connection each time.
     """
-    if standard == "CSRD":
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed CSRD-compliant report section."
-        )
-    elif standard == "GRI":
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed GRI-compliant report section."
-        )
-    elif standard == "TCFD":
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed TCFD-aligned report section."
-        )
-    elif standard == "SASB":
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed SASB-compliant report section."
-        )
-    elif standard == "Integrated Reporting (<IR>)":
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed Integrated Reporting (<IR>)-compliant report section."
-        )
-    elif standard == "CDP":
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed CDP-compliant report section focused on environmental transparency."
-        )
-    elif standard == "AA1000":
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed AA1000-compliant report section emphasizing stakeholder engagement and accountability."
-        )
-    elif standard == "ISO 26000":
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed report section aligned with ISO 26000 guidance on social responsibility."
-        )
-    elif standard == "ISSB":
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed ISSB-compliant report section addressing both climate-related and general sustainability disclosures."
-        )
-    elif standard == "ESRS":
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed ESRS-compliant report section covering environmental, social, and governance disclosures."
-        )
-    else:
-        prompt_intro = (
-            "You are a professional sustainability consultant. "
-            "Based on the provided answer, generate a detailed report section."
-        )
+    return diskcache.Cache(LLM_CACHE_DIR)
 
+
+def cache_key(model, messages, temperature, max_tokens):
+    """Build a stable cache key from every parameter that determines an LLM response."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def llm_cached(func):
+    """
+    Serve completions from the LLM response cache when possible.
+    Only deterministic requests (temperature 0) are cached. With bypass_cache=True the
+    lookup is skipped but the fresh response still replaces the cached one.
+    Streaming (generator) functions yield a cached response as a single chunk, and are only
+    cached once the whole stream has been consumed.
+    """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(model, messages, temperature, max_tokens=None, bypass_cache=False, **kwargs):
+            if temperature != 0:
+                return await func(model, messages, temperature, max_tokens, **kwargs)
+            key = cache_key(model, messages, temperature, max_tokens)
+            cache = get_llm_cache()
+            # The cache is SQLite on disk; keep its I/O off the shared report loop.
+            if not bypass_cache:
+                cached = await asyncio.to_thread(cache.get, key)
+                if cached is not None:
+                    return cached
+            response = await func(model, messages, temperature, max_tokens, **kwargs)
+            if response:
+                await asyncio.to_thread(cache.set, key, response, expire=LLM_CACHE_TTL_SECONDS)
+            return response
+        return async_wrapper
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def stream_wrapper(model, messages, temperature, max_tokens=None, bypass_cache=False, **kwargs):
+            if temperature != 0:
+                yield from func(model, messages, temperature, max_tokens, **kwargs)
+                return
+            key = cache_key(model, messages, temperature, max_tokens)
+            if not bypass_cache:
+                cached = get_llm_cache().get(key)
+                if cached is not None:
+                    yield cached
+                    return
+            parts = []
+            for part in func(model, messages, temperature, max_tokens, **kwargs):
+                parts.append(part)
+                yield part
+            response = "".join(parts)
+            if response:
+                get_llm_cache().set(key, response, expire=LLM_CACHE_TTL_SECONDS)
+        return stream_wrapper
+
+    raise TypeError(f"llm_cached supports coroutine and generator functions, not {func.__name__}")
+
+
+@llm_cached
+async def _acomplete(model, messages, temperature, max_tokens=None, client=None, on_delta=None,
+                     response_format=None):
+    """
+    Stream a chat completion on the given async client and return its full text.
+    Each content chunk is passed to on_delta as it arrives.
+    """
+    extra = {"response_format": response_format} if response_format else {}
+    stream = await client.chat.completions.create(
+        model=model, temperature=temperature, max_tokens=max_tokens, messages=messages, stream=True, **extra
+    )
+    parts = []
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            if on_delta is not None:
+                on_delta(chunk.choices[0].delta.content)
+    return "".join(parts)
+
+
+def _http_limits():
+    import httpx
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm_client():
+    """
+    Shared blocking client, created on first use and reused by every session.
+    Its HTTP connection pool survives between requests, so repeat calls skip the TLS handshake.
+    """
+    from openai import OpenAI, DefaultHttpxClient
+    return OpenAI(
+        api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT_SECONDS, max_retries=OPENAI_MAX_RETRIES,
+        http_client=DefaultHttpxClient(limits=_http_limits())
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _report_loop():
+    """
+    Long-lived event loop on a daemon thread that runs all report generation.
+    Async connections are bound to the loop that opened them, so sharing one loop is what lets
+    the shared async client keep its connections alive from one report to the next.
+    Held by st.cache_resource because Streamlit re-executes this module on every rerun, which
+    would give a module-level cache (and so a new thread) per run.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="report-loop", daemon=True).start()
+    return loop
+
+
+@st.cache_resource(show_spinner=False)
+def _get_async_client():
+    """Shared async client; must only be used from coroutines running on _report_loop()."""
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+    return AsyncOpenAI(
+        api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT_SECONDS, max_retries=OPENAI_MAX_RETRIES,
+        http_client=DefaultAsyncHttpxClient(limits=_http_limits())
+    )
+
+
+@llm_cached
+def _complete_stream(model, messages, temperature, max_tokens=None, client=None):
+    """Stream a chat completion on a blocking client (the shared one by default), yielding its text."""
+    client = client or get_llm_client()
+    stream = client.chat.completions.create(
+        model=model, temperature=temperature, max_tokens=max_tokens, messages=messages, stream=True
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+# ------------------------------------------------------------------------------
+# Semantic cache: one FAISS inner-product index per (standard, section) over L2-normalized
+# answer embeddings, persisted next to the generated section texts.
+# ------------------------------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def _semantic_registry():
+    """
+    The loaded indexes, {(standard, section_key): [index, section_texts]}, and the lock that
+    guards them and their files. Shared by every session, since the files on disk are too.
+    """
+    return {}, threading.Lock()
+
+
+def _semantic_cache_path(standard, section_key):
+    return os.path.join(SEMANTIC_CACHE_DIR, f"{normalize_key(standard)}_{section_key}")
+
+
+def _load_semantic_index(standard, section_key):
+    """
+    Return the [index, section_texts] entry for a section, loading it from disk on first use.
+    Must be called with the registry lock held.
+    """
+    indexes, _ = _semantic_registry()
+    entry_key = (standard, section_key)
+    if entry_key not in indexes:
+        base_path = _semantic_cache_path(standard, section_key)
+        index, texts = None, []
+        if os.path.exists(base_path + ".faiss"):
+            import faiss
+            index = faiss.read_index(base_path + ".faiss")
+            with open(base_path + ".json", encoding="utf-8") as f:
+                texts = json.load(f)
+            # The texts file is written first, so it can only be ahead of the index; row i of the
+            # index always belongs to texts[i].
+            if len(texts) < index.ntotal:
+                index, texts = None, []
+            else:
+                del texts[index.ntotal:]
+        indexes[entry_key] = [index, texts]
+    return indexes[entry_key]
+
+
+def _replace_file(path, write):
+    """Write a file through write(tmp_path) and move it into place atomically."""
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+async def _aembed(client, text):
+    """Embed a text and return it as a normalized (1, dim) float32 array."""
+    import faiss
+    import numpy as np
+
+    response = await client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+    vector = np.asarray([response.data[0].embedding], dtype="float32")
+    faiss.normalize_L2(vector)
+    return vector
+
+
+def semantic_lookup(standard, section_key, vector, threshold):
+    """
+    Return the cached section whose answer is most similar to `vector`, if it clears the threshold.
+    Blocking (it may load the index from disk); call it off the event loop.
+    """
+    _, lock = _semantic_registry()
+    with lock:
+        index, texts = _load_semantic_index(standard, section_key)
+        if index is None or index.ntotal == 0:
+            return None
+        scores, ids = index.search(vector, 1)
+        if scores[0][0] >= threshold and 0 <= ids[0][0] < len(texts):
+            return texts[ids[0][0]]
+    return None
+
+
+def semantic_store(standard, section_key, vector, section_text, threshold=SEMANTIC_CACHE_THRESHOLD):
+    """
+    Upsert a generated section into the semantic cache and persist it.
+    An entry that already matches `vector` at or above the threshold has its text replaced (so a
+    regeneration with "Bypass cache" refreshes it instead of adding a copy); otherwise the section is
+    appended, evicting the oldest entries beyond SEMANTIC_CACHE_MAX_ENTRIES.
+    Blocking (it rewrites the files); call it off the event loop.
+    """
+    import faiss
+
+    def write_texts(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entry[1], f)
+
+    _, lock = _semantic_registry()
+    with lock:
+        entry = _load_semantic_index(standard, section_key)
+        base_path = _semantic_cache_path(standard, section_key)
+        os.makedirs(SEMANTIC_CACHE_DIR, exist_ok=True)
+
+        if entry[0] is not None and entry[0].ntotal:
+            scores, ids = entry[0].search(vector, 1)
+            if scores[0][0] >= threshold and 0 <= ids[0][0] < len(entry[1]):
+                # Same answer: the index is unchanged, only its section text is refreshed.
+                entry[1][ids[0][0]] = section_text
+                _replace_file(base_path + ".json", write_texts)
+                return
+
+        if entry[0] is None:
+            entry[0] = faiss.IndexFlatIP(vector.shape[1])
+        elif entry[0].ntotal >= SEMANTIC_CACHE_MAX_ENTRIES:
+            keep = SEMANTIC_CACHE_MAX_ENTRIES - 1
+            kept_vectors = entry[0].reconstruct_n(entry[0].ntotal - keep, keep)
+            entry[0] = faiss.IndexFlatIP(vector.shape[1])
+            entry[0].add(kept_vectors)
+            del entry[1][:-keep]
+        entry[0].add(vector)
+        entry[1].append(section_text)
+        # Texts first: a crash between the two writes leaves extra texts, never dangling index rows.
+        _replace_file(base_path + ".json", write_texts)
+        _replace_file(base_path + ".faiss", lambda path: faiss.write_index(entry[0], path))
+
+
+# ------------------------------------------------------------------------------
+# Generate report sections concurrently, with a progress bar
+# ------------------------------------------------------------------------------
+def build_section_messages(section_key, question_text, answer, standard):
+    """
+    Build the chat messages that ask for one report section.
+    Shared by the interactive and batch generation paths.
+    The standard-specific instructions go in a system message that is identical for every
+    section of a report, so OpenAI's prompt caching can reuse that prefix; only the user
+    message varies.
+    """
+    system_prompt = SECTION_PROMPTS.get(standard, DEFAULT_SECTION_PROMPT)
+    template = SECTION_USER_TEMPLATES.get(section_key) or _section_user_template(question_text)
+    prompt = template.format(answer=answer)
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def combined_request_fits(section_count):
+    """Whether every section still gets a useful share of COMBINED_MAX_TOKENS in a single request."""
+    return section_count * COMBINED_MIN_SECTION_TOKENS <= COMBINED_MAX_TOKENS
+
+
+def build_combined_messages(answered, standard):
+    """
+    Build one request that asks for every answered section at once, returned as a JSON object
+    mapping each section key to its markdown. Uses the same system message as per-section requests.
+    Each section is given an equal share of COMBINED_MAX_TOKENS as a word limit, so the whole
+    answer fits in one response instead of being cut off.
+    """
+    system_prompt = SECTION_PROMPTS.get(standard, DEFAULT_SECTION_PROMPT)
+    items = "\n\n".join(
+        f"[{key}]\nSection: {question_text}\nProvided Answer: {answer}"
+        for key, question_text, answer in answered
+    )
+    keys = ", ".join(key for key, _, _ in answered)
+    # Roughly 0.7 words per token, leaving room for the JSON keys and escaping.
+    max_words = COMBINED_MAX_TOKENS // len(answered) * 7 // 10
     prompt = (
-        f"{prompt_intro}\n\n"
-        f"Section: {question_text}\n"
-        f"Provided Answer: {answer}\n\n"
-        "Please write a comprehensive section on this topic."
+        "Please write a comprehensive report section for each of the following items.\n\n"
+        f"{items}\n\n"
+        f"Keep each section under {max_words} words so the whole answer fits in one response.\n"
+        f"Return a JSON object with keys exactly: {keys}. Each value is the markdown section for that key."
     )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+
+
+# A complete "key": "string value" pair in the combined JSON answer. Quotes inside a JSON string
+# are always escaped, so this cannot match inside a value, and it still finds every finished pair
+# when the text after them was cut off by the token limit.
+_JSON_STRING_PAIR = re.compile(r'"(\w+)"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def _completed_pairs(text, keys, start=0):
+    """Yield (key, value, end) for each complete pair of one of `keys` in text[start:]."""
+    for match in _JSON_STRING_PAIR.finditer(text, start):
+        if match.group(1) not in keys:
+            continue
+        try:
+            value = orjson.loads(match.group(2))
+        except orjson.JSONDecodeError:
+            continue
+        yield match.group(1), value, match.end()
+
 
+async def _agenerate_combined(client, answered, standard, temperature, bypass_cache, on_section):
+    """
+    Generate all sections with a single JSON-mode request.
+    Each section is passed to on_section(key, markdown) as soon as its pair in the streamed JSON is
+    complete. If the answer is not valid JSON (e.g. truncated at the token limit), every completed
+    pair is still salvaged. Returns {section_key: markdown}; missing sections are simply absent
+    so the caller can generate them one by one.
+    """
+    keys = {key for key, _, _ in answered}
+    found = {}
+    parts = []
+    scanned = 0
+
+    def collect(text):
+        nonlocal scanned
+        for key, value, end in _completed_pairs(text, keys, scanned):
+            scanned = end
+            if key not in found and isinstance(value, str) and value.strip():
+                found[key] = value
+                on_section(key, value)
+
+    def on_delta(text):
+        parts.append(text)
+        # A pair can only have just completed if this chunk closed a string.
+        if '"' in text:
+            collect("".join(parts))
+
+    content = await _acomplete(
+        SECTION_MODEL, build_combined_messages(answered, standard), temperature, COMBINED_MAX_TOKENS,
+        bypass_cache=bypass_cache, client=client, on_delta=on_delta, response_format={"type": "json_object"}
+    )
     try:
-        llm = ChatOpenAI(model="gpt-4-turbo", temperature=0.7, max_tokens=800, streaming=True)
-        messages = [{"role": "user", "content": prompt}]
-        response = llm(messages)
-        return response.content
-    except Exception as e:
-        st.error(f"An error occurred during report generation: {e}")
-        return ""
+        data = orjson.loads(content)
+    except orjson.JSONDecodeError:
+        data = None
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in keys and key not in found and isinstance(value, str) and value.strip():
+                found[key] = value
+                on_section(key, value)
+    else:
+        # Truncated or malformed: keep every pair that was completed (also covers cached answers,
+        # which are returned without streaming).
+        scanned = 0
+        collect(content)
+    return found
+
+
+async def agenerate_section(client, semaphore, section_key, question_text, answer, standard,
+                            temperature=DEFAULT_TEMPERATURE, bypass_cache=False,
+                            semantic_threshold=SEMANTIC_CACHE_THRESHOLD, on_delta=None):
+    """
+    Generate a report section for a specific question and answer.
+    Uses a per-section token limit; the semaphore bounds concurrent API calls.
+    A near-duplicate answer seen before (cosine similarity >= semantic_threshold)
+    reuses the previously generated section instead of calling the model.
+    Freshly generated text is streamed chunk by chunk to on_delta.
+    Completion errors propagate to the caller. The semantic cache is only an optimization: a failed
+    embedding, lookup or store is logged and never costs the section.
+    """
+    vector = None
+    if section_key not in SEMANTIC_CACHE_EXCLUDED_KEYS:
+        try:
+            async with semaphore:
+                vector = await _aembed(client, answer)
+        except Exception:
+            # The semantic cache is only an optimization; generate the section without it.
+            logger.warning("Embedding failed for section %s; skipping the semantic cache", section_key,
+                           exc_info=True)
+        if vector is not None and not bypass_cache:
+            try:
+                cached_section = await asyncio.to_thread(
+                    semantic_lookup, standard, section_key, vector, semantic_threshold
+                )
+            except Exception:
+                logger.warning("Semantic cache lookup failed for section %s", section_key, exc_info=True)
+                cached_section = None
+            if cached_section is not None:
+                return cached_section
+
+    messages = build_section_messages(section_key, question_text, answer, standard)
+    async with semaphore:
+        section_content = await _acomplete(
+            SECTION_MODEL, messages, temperature, SECTION_MAX_TOKENS,
+            bypass_cache=bypass_cache, client=client, on_delta=on_delta
+        )
+    if vector is not None and section_content:
+        try:
+            await asyncio.to_thread(
+                semantic_store, standard, section_key, vector, section_content, semantic_threshold
+            )
+        except Exception:
+            # Never lose a completion that has already been paid for.
+            logger.warning("Semantic cache store failed for section %s", section_key, exc_info=True)
+    return section_content
 
 
-def generate_full_report(report_data, standard="CSRD"):
+async def _agenerate_sections(answered, standard, events, temperature, bypass_cache, semantic_threshold,
+                              single_request=False):
     """
-    Generate the full sustainability report by iterating over each questionnaire item.
-    Each section is generated separately, with a progress bar showing the generation percentage.
+    Dispatch all section requests concurrently. Runs on the background report worker, so it never
+    touches Streamlit: streamed text ("delta"), finished sections ("section") and failures ("error")
+    are pushed onto the `events` queue as (kind, index, payload) for the UI thread to render.
+    With single_request, all sections are first requested in one JSON-mode call and only the
+    sections missing from its answer fall back to individual requests.
+    Returns the section texts in questionnaire order.
     """
-    full_report = ""
-    # Determine the total number of sections that have content.
-    answered_keys = [key for key, _ in questions if report_data.get(key, "").strip()]
-    total_sections = len(answered_keys)
-    if total_sections == 0:
+    client = _get_async_client()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SECTIONS)
+
+    async def run(index, key, question_text, answer):
+        try:
+            return index, await agenerate_section(
+                client, semaphore, key, question_text, answer, standard,
+                temperature, bypass_cache, semantic_threshold,
+                on_delta=lambda text: events.put(("delta", index, text))
+            )
+        except Exception as e:
+            events.put(("error", index, str(e)))
+            return index, ""
+
+    sections = [""] * len(answered)
+    pending = list(range(len(answered)))
+    if single_request:
+        positions = {key: index for index, (key, _, _) in enumerate(answered)}
+
+        def on_section(key, section_content):
+            sections[positions[key]] = section_content
+            events.put(("section", positions[key], section_content))
+
+        try:
+            await _agenerate_combined(client, answered, standard, temperature, bypass_cache, on_section)
+        except Exception:
+            # Whatever did not arrive is generated per section below.
+            logger.warning("Single-request generation failed; falling back to per-section", exc_info=True)
+        pending = [index for index in pending if not sections[index]]
+
+    tasks = [run(index, *answered[index]) for index in pending]
+    for next_done in asyncio.as_completed(tasks):
+        index, section_content = await next_done
+        sections[index] = section_content
+        events.put(("section", index, section_content))
+    return sections
+
+
+def generate_full_report(report_data, standard="CSRD", temperature=DEFAULT_TEMPERATURE, bypass_cache=False,
+                         semantic_threshold=SEMANTIC_CACHE_THRESHOLD, single_request=False):
+    """
+    Generate the full sustainability report from the answered questionnaire items.
+    All sections are generated concurrently on the shared background event loop while this (UI)
+    thread polls its event queue to stream section text and advance the progress bar.
+    """
+    # Collect the questionnaire items that have content.
+    answered = [
+        (key, question_text, report_data[key])
+        for key, question_text in questions
+        if report_data.get(key, "").strip()
+    ]
+    if not answered:
         st.error("No responses provided.")
         return ""
 
+    if single_request and not combined_request_fits(len(answered)):
+        st.info(
+            f"{len(answered)} sections are too many for a single request, "
+            "so they are generated individually."
+        )
+        single_request = False
+
     progress_bar = st.progress(0)  # Initialize progress bar at 0%
+    # Live preview: one slot per section, in questionnaire order, filled as tokens arrive.
+    preview = st.container()
+    placeholders = [preview.empty() for _ in answered]
+    streamed = [[] for _ in answered]
     completed = 0
 
-    for key, question_text in questions:
-        answer = report_data.get(key, "")
-        if answer.strip():
-            section_content = generate_section(key, question_text, answer, standard)
-            full_report += f"# {section_content}\n\n"
-            completed += 1
-            progress_percent = int((completed / total_sections) * 100)
-            progress_bar.progress(progress_percent)
-    return full_report
+    def drain_events():
+        """Apply every queued worker event, re-rendering each changed section only once."""
+        nonlocal completed
+        changed = set()
+        while True:
+            try:
+                kind, index, payload = events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "delta":
+                streamed[index].append(payload)
+                changed.add(index)
+            elif kind == "section":
+                # Cached sections arrive in one piece, so always show the final text.
+                streamed[index] = [payload]
+                changed.add(index)
+                completed += 1
+                progress_bar.progress(int((completed / len(answered)) * 100))
+            elif kind == "error":
+                st.error(f"An error occurred during report generation: {payload}")
+        for index in changed:
+            placeholders[index].markdown("".join(streamed[index]))
+
+    events = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(
+        _agenerate_sections(
+            answered, standard, events, temperature, bypass_cache, semantic_threshold, single_request
+        ),
+        _report_loop()
+    )
+    while not future.done():
+        drain_events()
+        time.sleep(PROGRESS_POLL_SECONDS)
+    drain_events()
+    sections = future.result()
+
+    # The finished report is rendered by the caller, so clear the preview.
+    for placeholder in placeholders:
+        placeholder.empty()
+    return "".join(f"# {section_content}\n\n" for section_content in sections)
+
+
+# ------------------------------------------------------------------------------
+# Cheap mode: submit all sections through the OpenAI Batch API (half price, 24h window)
+# ------------------------------------------------------------------------------
+def submit_report_batch(report_data, standard="CSRD", temperature=DEFAULT_TEMPERATURE):
+    """
+    Upload one chat-completion request per answered section as a single batch job.
+    Returns the batch ID, which is all that is needed to collect the report later.
+    """
+    lines = [
+        {
+            "custom_id": key,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": SECTION_MODEL,
+                "max_tokens": SECTION_MAX_TOKENS,
+                "temperature": temperature,
+                "messages": build_section_messages(key, question_text, report_data[key], standard),
+            },
+        }
+        for key, question_text in questions
+        if report_data.get(key, "").strip()
+    ]
+    if not lines:
+        st.error("No responses provided.")
+        return ""
+
+    payload = "\n".join(json.dumps(line) for line in lines).encode("utf-8")
+    client = get_llm_client()
+    batch_file = client.files.create(file=("report_sections.jsonl", payload), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+    )
+    return batch.id
+
+
+def _read_batch_file(client, file_id):
+    """Return the JSONL records of a batch output or error file (none if there is no file)."""
+    if not file_id:
+        return []
+    return [json.loads(line) for line in client.files.content(file_id).text.splitlines() if line.strip()]
+
+
+def fetch_report_batch(batch_id):
+    """
+    Check on a submitted batch and return (status, report, failed_keys).
+    The report is empty until the batch has completed; sections are assembled in questionnaire order.
+    failed_keys lists the sections whose requests failed, from both the output and the error file.
+    """
+    client = get_llm_client()
+    batch = client.batches.retrieve(batch_id)
+    if batch.status != "completed":
+        return batch.status, "", []
+
+    sections, failed_keys = {}, []
+    records = _read_batch_file(client, batch.output_file_id) + _read_batch_file(client, batch.error_file_id)
+    for record in records:
+        response = record.get("response") or {}
+        content = ""
+        if response.get("status_code") == 200:
+            content = response["body"]["choices"][0]["message"]["content"] or ""
+        if content:
+            sections[record["custom_id"]] = content
+        else:
+            failed_keys.append(record["custom_id"])
+    report = "".join(f"# {sections[key]}\n\n" for key, _ in questions if sections.get(key))
+    failed_keys = [key for key, _ in questions if key in failed_keys]
+    return batch.status, report, failed_keys
 
 
 # ------------------------------------------------------------------------------
 # Evaluate report with AI: returns detailed insights as a JSON object
 # ------------------------------------------------------------------------------
-def measure_compliance(report_text, standard="CSRD"):
-    if standard == "CSRD":
-        compliance_prompt = (
-            "You are an expert in sustainability reporting with extensive knowledge of the CSRD standard. "
-            "Evaluate the compliance of the following report with the CSRD standard and provide your evaluation "
-            "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
-            "'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
-    elif standard == "GRI":
-        compliance_prompt = (
-            "You are an expert in sustainability reporting with extensive knowledge of the GRI standards. "
-            "Evaluate the compliance of the following report with the GRI standards and provide your evaluation "
-            "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
-            "'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
-    elif standard == "TCFD":
-        compliance_prompt = (
-            "You are an expert in sustainability reporting with extensive knowledge of the TCFD recommendations. "
-            "Evaluate the compliance of the following report with the TCFD recommendations and provide your evaluation "
-            "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
-            "'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
-    elif standard == "SASB":
-        compliance_prompt = (
-            "You are an expert in sustainability reporting with extensive knowledge of SASB standards. "
-            "Evaluate the compliance of the following report with SASB standards and provide your evaluation "
-            "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
-            "'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
-    elif standard == "Integrated Reporting (<IR>)":
-        compliance_prompt = (
-            "You are an expert in sustainability reporting with extensive knowledge of Integrated Reporting (<IR>) guidelines. "
-            "Evaluate the compliance of the following report with Integrated Reporting guidelines and provide your evaluation "
-            "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
-            "'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
-    elif standard == "CDP":
-        compliance_prompt = (
-            "You are an expert in sustainability reporting with extensive knowledge of CDP requirements. "
-            "Evaluate the compliance of the following report with CDP guidelines and provide your evaluation "
-            "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
-            "'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
-    elif standard == "AA1000":
-        compliance_prompt = (
-            "You are an expert in sustainability reporting with extensive knowledge of AA1000 standards. "
-            "Evaluate the compliance of the following report with AA1000 principles and provide your evaluation "
-            "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
-            "'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
-    elif standard == "ISO 26000":
-        compliance_prompt = (
-            "You are an expert in sustainability reporting with extensive knowledge of ISO 26000 guidance. "
-            "Evaluate the compliance of the following report with ISO 26000 principles on social responsibility and provide your evaluation "
-            "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
-            "'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
-    elif standard == "ISSB":
-        compliance_prompt = (
-            "You are an expert in sustainability reporting with extensive knowledge of ISSB guidelines. "
-            "Evaluate the compliance of the following report with ISSB standards and provide your evaluation "
-            "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
-            "'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
-    elif standard == "ESRS":
-        compliance_prompt = (
-            "You are an expert in sustainability reporting with extensive knowledge of the European Sustainability Reporting Standards (ESRS). "
-            "Evaluate the compliance of the following report with ESRS and provide your evaluation "
-            "in a JSON format with the following keys: 'score' (a number between 1 and 100), 'strengths', "
-            "'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
+# Only the beginning of the report is sent for evaluation, to stay within gpt-4's context window.
+EVALUATION_MAX_TOKENS = 3000
+# Tokenizer used by gpt-4, the evaluation model.
+EVALUATION_ENCODING = "cl100k_base"
+
+# The model sometimes wraps its JSON answer in a ```json ... ``` fence.
+_JSON_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+
+# Leading number of a score the model returned as text, e.g. "85", "85/100" or "85%".
+_SCORE_NUMBER = re.compile(r"^\s*(\d+(?:\.\d+)?)")
+
+
+def _coerce_score(value):
+    """
+    Normalize the model's score to a float in [0, 100], or None if it is missing or unreadable.
+    Done once per evaluation so the rendering code never has to convert it again.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        score = float(value)
+    elif isinstance(value, str) and (match := _SCORE_NUMBER.match(value)):
+        score = float(match.group(1))
     else:
-        compliance_prompt = (
-            "You are an expert in sustainability reporting. "
-            "Evaluate the compliance of the following report with the relevant sustainability reporting standards "
-            "and provide your evaluation in a JSON format with the following keys: 'score' (a number between 1 and 100), "
-            "'strengths', 'weaknesses', and 'recommendations'. Here is the report:\n\n" + report_text
-        )
-    llm = ChatOpenAI(model="gpt-4", temperature=0.7)
+        return None
+    return min(max(score, 0.0), 100.0)
+
+
+def _normalize_compliance(data, raw_text=""):
+    """
+    Give every evaluation the same shape: exactly score, strengths, weaknesses and recommendations.
+    A reply that is not a JSON object is kept as the strengths text so nothing is lost.
+    """
+    if not isinstance(data, dict):
+        data = {"strengths": raw_text}
+    return {
+        "score": _coerce_score(data.get("score")),
+        "strengths": data.get("strengths") or "",
+        "weaknesses": data.get("weaknesses") or "",
+        "recommendations": data.get("recommendations") or "",
+    }
+
+
+def measure_compliance_stream(report_text, standard="CSRD", temperature=DEFAULT_TEMPERATURE, bypass_cache=False,
+                              client=None):
+    """Yield the evaluation reply as it is generated; pass the joined text to parse_compliance."""
+    compliance_prompt = COMPLIANCE_PROMPTS.get(standard, DEFAULT_COMPLIANCE_PROMPT).format(report=report_text)
     messages = [{"role": "user", "content": compliance_prompt}]
-    response = llm(messages)
-    result = response.content.strip()
+    yield from _complete_stream("gpt-4", messages, temperature, bypass_cache=bypass_cache, client=client)
+
+
+def parse_compliance(reply):
+    """Parse a complete evaluation reply into the normalized compliance result."""
+    result = reply.strip()
+    fenced = _JSON_FENCE.match(result)
     try:
-        data = json.loads(result)
-        if not isinstance(data, dict):
-            data = {"score": None, "strengths": result, "weaknesses": "", "recommendations": ""}
-    except Exception:
-        data = {"score": None, "strengths": result, "weaknesses": "", "recommendations": ""}
-    return data
+        data = orjson.loads(fenced.group(1) if fenced else result)
+    except orjson.JSONDecodeError:
+        data = None
+    return _normalize_compliance(data, result)
+
+
+@st.cache_resource(show_spinner=False)
+def _token_encoder():
+    import tiktoken
+    return tiktoken.get_encoding(EVALUATION_ENCODING)
+
+
+def shorten_text(text, max_tokens=EVALUATION_MAX_TOKENS):
+    """Cut text to at most max_tokens tokens of the evaluation model's tokenizer."""
+    # cl100k_base is byte-level BPE: every token covers at least one UTF-8 byte (a CJK character
+    # or emoji can take 2-3 tokens), so only texts short in bytes can skip encoding.
+    if len(text.encode("utf-8")) <= max_tokens:
+        return text
+    encoder = _token_encoder()
+    tokens = encoder.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoder.decode(tokens[:max_tokens])
+
+
+def store_report(report):
+    """
+    Save a generated report together with the shortened copy sent for evaluation, so the two
+    are always replaced together and the truncation happens once rather than on every click.
+    Everything is computed before any key is assigned, so a failure (e.g. the tokenizer download)
+    leaves the previous report intact rather than half-replaced.
+    """
+    # Shorten the report to ensure it fits within the evaluation model's token limits.
+    short_report = shorten_text(report)
+    # Content hash that identifies this report for the PDF cache and the download button key.
+    report_hash = hashlib.blake2b(report.encode("utf-8"), digest_size=8).hexdigest()
+    st.session_state.update(generated_report=report, short_report=short_report, report_hash=report_hash)
+
+
+# Line breaks in free-form insight text, together with any bullet ("-", "*", "\u2022") or
+# "1." number marker that starts the next line.
+_BULLET_SPLIT = re.compile(r"(?:^|\n)\s*(?:(?:[-*\u2022]|\d+\.)\s+)?")
+
+
+def _parse_insights(text):
+    """
+    Split an insights string into items, one per non-empty line, without bullet markers.
+    Only called through _insights_md, whose st.cache_data already memoizes the result.
+    """
+    return tuple(item.strip() for item in _BULLET_SPLIT.split(text) if item.strip())
 
 
-def display_insights_as_list_or_text(content):
+def _bulletize(content):
+    """
+    Turn one insights field into markdown: a list or multi-line string becomes "- item" lines,
+    a single paragraph is kept as it is.
+    """
     if isinstance(content, list):
-        for item in content:
-            st.markdown(f"- {item}")
+        items = tuple(str(item) for item in content)
     else:
-        st.write(content)
+        items = _parse_insights(str(content))
+        if len(items) <= 1:
+            return str(content)
+    return "\n".join(f"- {item}" for item in items)
+
+
+@st.cache_data(show_spinner=False)
+def _insights_md(strengths, weaknesses, recommendations):
+    """Build the three insights sections as one markdown string, so they render as a single element."""
+    return "\n\n".join([
+        "### Strengths", _bulletize(strengths),
+        "### Weaknesses", _bulletize(weaknesses),
+        "### Recommendations", _bulletize(recommendations),
+    ])
+
+
+@st.fragment
+def _render_compliance():
+    """
+    Render the AI score and insights as a fragment, so interactions inside it (and any later
+    fragment reruns) rebuild only this block instead of the whole page.
+    """
+    st.subheader("AI Score and Insights")
+    # compliance_result is only ever set from parse_compliance, which always returns the normalized
+    # shape, so no type checks are needed here.
+    compliance_data = st.session_state.compliance_result
+    score = compliance_data["score"]
+
+    if score is not None:
+        st.markdown(f"### AI Score: **{score:g}** / 100")
+        # Emitted on every run on purpose: skipping it when the score is unchanged would make
+        # Streamlit delete the bar, and an unchanged element already costs next to nothing.
+        st.progress(score / 100.0, text=f"Score {score:g}/100")
+    else:
+        st.markdown("### AI Score: Not Available")
+
+    st.markdown(_insights_md(
+        compliance_data["strengths"], compliance_data["weaknesses"], compliance_data["recommendations"]
+    ))
 
 
 # ------------------------------------------------------------------------------
@@ -433,6 +1305,119 @@ questions = [
 ]
 
 
+def _section_user_template(question_text):
+    """User-message skeleton for one section; only the {answer} placeholder is left to fill."""
+    return (
+        f"Section: {question_text}\n"
+        "Provided Answer: {answer}\n\n"
+        "Please write a comprehensive section on this topic."
+    )
+
+
+# Section prompts are fixed per question, so they are built once at import.
+SECTION_USER_TEMPLATES = {key: _section_user_template(question_text) for key, question_text in questions}
+
+
+# ------------------------------------------------------------------------------
+# Results view: the generated report, its downloads and the AI evaluation
+# ------------------------------------------------------------------------------
+# The step at which every question has been answered and the review/report stage is shown.
+FINAL_STEP = len(questions)
+
+
+def _render_results(temperature, bypass_cache):
+    """
+    Show the generated report with its copy and PDF buttons, the Evaluate form and any results.
+    Only called at FINAL_STEP once a report exists, so earlier reruns never build these widgets.
+    """
+    st.subheader("Your Sustainability Report")
+    st.write(st.session_state.generated_report)
+
+    c1, c2 = st.columns(2)
+    with c1:
+        copy_to_clipboard_button(st.session_state.generated_report)
+    with c2:
+        company_name = st.session_state.report_data.get("company_name", "company")
+        # Keep this session's PDF keyed by the report hash, so reruns reuse the bytes
+        # without hashing the whole report again to look it up.
+        pdf_key = (st.session_state.report_hash, company_name, st.session_state.current_standard)
+        pdf_cache = st.session_state._pdf_cache
+        if pdf_cache is None or pdf_cache["key"] != pdf_key:
+            pdf_cache = {
+                "key": pdf_key,
+                "bytes": _cached_pdf(
+                    st.session_state.generated_report, company_name, st.session_state.current_standard
+                ),
+            }
+            st.session_state._pdf_cache = pdf_cache
+        current_year = datetime.now().year
+        file_name = f"{current_year} {company_name} - {st.session_state.current_standard} Report.pdf"
+        st.download_button(
+            label="Download as PDF 📥",
+            data=pdf_cache["bytes"],
+            file_name=file_name,
+            mime="application/pdf",
+            key=f"dl_{st.session_state.report_hash}"
+        )
+
+    # A form, so evaluating triggers exactly one rerun with the submission applied.
+    with st.form("evaluate_form", border=False):
+        evaluate = st.form_submit_button("Evaluate with AI 🤖")
+    if evaluate:
+        short_report = st.session_state.short_report
+        # Identify the evaluated content, so a repeat click on an unchanged report is a no-op.
+        eval_hash = hashlib.blake2b(
+            f"{st.session_state.current_standard}\0{short_report}".encode("utf-8"), digest_size=8
+        ).hexdigest()
+        if (not bypass_cache and st.session_state.last_eval_hash == eval_hash
+                and st.session_state.compliance_result):
+            st.info("This report has already been evaluated.")
+        else:
+            # Show the reply as it streams in, then replace it with the parsed insights.
+            placeholder = st.empty()
+            placeholder.caption("Evaluating report...")
+            parts = []
+            for delta in measure_compliance_stream(
+                short_report, st.session_state.current_standard,
+                temperature=temperature, bypass_cache=bypass_cache
+            ):
+                parts.append(delta)
+                placeholder.code("".join(parts), language="json")
+            placeholder.empty()
+            st.session_state.compliance_result = parse_compliance("".join(parts))
+            st.session_state.last_eval_hash = eval_hash
+            st.success("AI evaluation complete!")
+
+    if st.session_state.compliance_result:
+        _render_compliance()
+
+
+# ------------------------------------------------------------------------------
+# Session state defaults
+# ------------------------------------------------------------------------------
+_DEFAULTS = {
+    "step": 0,
+    "mode": None,
+    "report_data": {},
+    "generated_report": "",
+    "short_report": "",
+    "report_hash": "",
+    "_pdf_cache": None,
+    "current_standard": "",
+    "compliance_result": {},
+    "last_eval_hash": "",
+    "batch_id": "",
+}
+
+
+def reset_session_state():
+    """
+    Restore every session key to its default in a single update. The defaults are deep-copied
+    so answers written into report_data never leak back into _DEFAULTS.
+    """
+    st.session_state.update(copy.deepcopy(_DEFAULTS))
+
+
 # ------------------------------------------------------------------------------
 # Main function: Streamlit app workflow
 # ------------------------------------------------------------------------------
@@ -441,18 +1426,35 @@ def main():
     st.title("Resonate AI Sustainability Report Builder")
 
     # --- Initialize Session State Variables ---
-    if "step" not in st.session_state:
-        st.session_state.step = 0
-    if "mode" not in st.session_state:
-        st.session_state.mode = None
-    if "report_data" not in st.session_state:
-        st.session_state.report_data = {}
-    if "generated_report" not in st.session_state:
-        st.session_state.generated_report = ""
-    if "current_standard" not in st.session_state:
-        st.session_state.current_standard = ""
-    if "compliance_result" not in st.session_state:
-        st.session_state.compliance_result = {}
+    if "_init" not in st.session_state:
+        reset_session_state()
+        st.session_state._init = True
+
+    # --- Sidebar: LLM response cache controls ---
+    st.sidebar.markdown("### Generation Settings")
+    deterministic = st.sidebar.toggle(
+        "Deterministic output",
+        help="Generate with temperature 0 so repeated requests are served from the response cache."
+    )
+    bypass_cache = st.sidebar.checkbox(
+        "Bypass cache",
+        help="Always call the model and refresh the cached response."
+    )
+    temperature = 0 if deterministic else DEFAULT_TEMPERATURE
+    st.sidebar.slider(
+        "Semantic cache threshold", min_value=0.80, max_value=1.0,
+        value=SEMANTIC_CACHE_THRESHOLD, step=0.01, key="semantic_cache_threshold",
+        help="Reuse a previously generated section when a new answer is at least this similar."
+    )
+    generation_mode = st.sidebar.radio(
+        "Generation mode", [MODE_PARALLEL, MODE_SINGLE_REQUEST, MODE_BATCH],
+        help="Parallel sections: one request per section, streamed as they are written. "
+             "Single request: all sections in one shorter JSON response, falling back to per-section "
+             "requests if it comes back incomplete or too many questions are answered to fit. "
+             "Cheap mode: the OpenAI Batch API at half the cost; results can take up to 24 hours and "
+             "you can close the tab and resume with the batch ID."
+    )
+    cheap_mode = generation_mode == MODE_BATCH
 
     # --- INITIAL CHOICE: Explanation & Options ---
     if st.session_state.mode is None:
@@ -485,29 +1487,10 @@ def main():
         st.markdown("### Upload Your Excel File")
         st.write("If you need a template, download it below, fill it out, and then upload your file.")
 
-        # Create an Excel template DataFrame
-        template_df = pd.DataFrame({
-            "Key": [
-                "Company Name", "Industry", "Overview", "Governance", "Ethics",
-                "Business Model", "Strategy", "Stakeholder Engagement", "Materiality",
-                "Environmental Performance", "Environmental Targets", "Social Performance",
-                "Community Engagement", "Labor Practices", "Human Rights", "Supply Chain",
-                "Supplier Evaluation", "Financial Sustainability", "Reporting Frameworks",
-                "Data Assurance", "KPI", "Future Goals", "Innovation", "Risk Management"
-            ],
-            "Value": ["" for _ in range(24)]
-        })
-
-        # Save the template as an Excel file in memory
-        excel_buffer = BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-            template_df.to_excel(writer, index=False)
-        excel_data = excel_buffer.getvalue()
-
         # Provide a download button for the template
         st.download_button(
             label="Download Excel Template",
-            data=excel_data,
+            data=build_template_bytes(),
             file_name="sustainability_report_template.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
@@ -519,10 +1502,10 @@ def main():
             st.session_state.report_data.update(parsed_data)
             st.success("File processed and responses filled!")
             # Jump directly to review/edit stage.
-            st.session_state.step = len(questions)
+            st.session_state.step = FINAL_STEP
 
     # --- QUESTIONNAIRE FLOW ---
-    if st.session_state.mode == "questionnaire" and st.session_state.step < len(questions):
+    if st.session_state.mode == "questionnaire" and st.session_state.step < FINAL_STEP:
         # Back Button: if pressed on the first question, return to the welcome page.
         if st.button("Back", key="back_button"):
             if st.session_state.step > 0:
@@ -540,7 +1523,7 @@ def main():
                 st.session_state.step += 1
 
     # --- REVIEW & REPORT GENERATION STAGE ---
-    elif st.session_state.mode in ["questionnaire", "upload"] and st.session_state.step >= len(questions):
+    elif st.session_state.mode in ["questionnaire", "upload"] and st.session_state.step >= FINAL_STEP:
         st.header("Review and Edit Your Responses ✏️")
         for i, (k, q) in enumerate(questions):
             st.markdown(f"**{q}**")
@@ -571,88 +1554,60 @@ def main():
 
         if st.button("Generate Report"):
             st.session_state.current_standard = selected_standard
-            with st.spinner(f"Generating {selected_standard} report..."):
-                # Generate the full report by section, with a progress bar
-                st.session_state.generated_report = generate_full_report(
-                    st.session_state.report_data, standard=selected_standard
-                )
-            st.success(f"{selected_standard} report generated successfully!")
-
-        if st.session_state.generated_report:
-            st.subheader("Your Sustainability Report")
-            st.write(st.session_state.generated_report)
-
-            c1, c2 = st.columns(2)
-            with c1:
-                if st.button("Copy to Clipboard"):
-                    pyperclip.copy(st.session_state.generated_report)
-                    st.success("Report copied to clipboard!")
-            with c2:
-                pdf_bytes = create_pdf(
-                    st.session_state.generated_report,
-                    st.session_state.report_data.get("company_name", "company"),
-                    st.session_state.current_standard
-                )
-                current_year = datetime.now().year
-                file_name = f"{current_year} {st.session_state.report_data.get('company_name', 'company')} - {st.session_state.current_standard} Report.pdf"
-                st.download_button(
-                    label="Download as PDF 📥",
-                    data=pdf_bytes,
-                    file_name=file_name,
-                    mime="application/pdf"
-                )
+            if cheap_mode:
+                with st.spinner(f"Submitting {selected_standard} report batch..."):
+                    try:
+                        st.session_state.batch_id = submit_report_batch(
+                            st.session_state.report_data, standard=selected_standard, temperature=temperature
+                        )
+                    except Exception as e:
+                        st.error(f"An error occurred while submitting the batch: {e}")
+            else:
+                with st.spinner(f"Generating {selected_standard} report..."):
+                    # Generate the full report by section, with a progress bar
+                    store_report(generate_full_report(
+                        st.session_state.report_data, standard=selected_standard,
+                        temperature=temperature, bypass_cache=bypass_cache,
+                        semantic_threshold=st.session_state.semantic_cache_threshold,
+                        single_request=generation_mode == MODE_SINGLE_REQUEST
+                    ))
+                st.success(f"{selected_standard} report generated successfully!")
 
-            def shorten_text(text, max_chars=3000):
-                """
-                Simple function to truncate the text to a maximum number of characters.
-                You may also consider a summarization approach for a more refined summary.
-                """
-                return text if len(text) <= max_chars else text[:max_chars]
-
-            if st.button("Evaluate with AI 🤖"):
-                with st.spinner("Evaluating report..."):
-                    # Shorten the generated report to ensure it fits within token limits
-                    short_report = shorten_text(st.session_state.generated_report)
-                    st.session_state.compliance_result = measure_compliance(short_report,
-                                                                            st.session_state.current_standard)
-                st.success("AI evaluation complete!")
-
-            if st.session_state.compliance_result:
-                st.subheader("AI Score and Insights")
-                compliance_data = st.session_state.compliance_result
-                if isinstance(compliance_data, dict):
-                    score = compliance_data.get("score")
-                    strengths = compliance_data.get("strengths", "")
-                    weaknesses = compliance_data.get("weaknesses", "")
-                    recommendations = compliance_data.get("recommendations", "")
-                else:
-                    score = None
-                    strengths = compliance_data
-                    weaknesses = ""
-                    recommendations = ""
-
-                if score is not None:
-                    st.markdown(f"### AI Score: **{score}** / 100")
-                    st.progress(int(score))
+        # --- Batch (cheap mode) status: lets users leave and collect the report later ---
+        if cheap_mode or st.session_state.batch_id:
+            st.markdown("#### Batch Status")
+            batch_id = st.text_input(
+                "Batch ID", value=st.session_state.batch_id,
+                help="Keep this ID to check on your report later, or paste an earlier one to resume it."
+            )
+            if batch_id and st.button("Check Batch Status"):
+                try:
+                    status, report, failed_keys = fetch_report_batch(batch_id)
+                except Exception as e:
+                    st.error(f"An error occurred while checking the batch: {e}")
                 else:
-                    st.markdown("### AI Score: Not Available")
+                    st.session_state.batch_id = batch_id
+                    st.write(f"Batch status: **{status}**")
+                    if failed_keys:
+                        question_texts = dict(questions)
+                        st.warning(
+                            "These sections could not be generated and are missing from the report:\n"
+                            + "\n".join(f"- {question_texts[key]}" for key in failed_keys)
+                        )
+                    if status == "completed" and not report:
+                        st.error("The batch completed, but none of its sections were generated.")
+                    if report:
+                        st.session_state.current_standard = selected_standard
+                        store_report(report)
+                        st.session_state.batch_id = ""
+                        st.success(f"{selected_standard} report generated successfully!")
 
-                st.markdown("### Strengths")
-                display_insights_as_list_or_text(strengths)
-                st.markdown("### Weaknesses")
-                display_insights_as_list_or_text(weaknesses)
-                st.markdown("### Recommendations")
-                display_insights_as_list_or_text(recommendations)
+        if st.session_state.step == FINAL_STEP and st.session_state.generated_report:
+            _render_results(temperature, bypass_cache)
 
         if st.button("Start Over 🔄"):
-            st.session_state.step = 0
-            st.session_state.report_data = {}
-            st.session_state.generated_report = ""
-            st.session_state.compliance_result = {}
-            st.session_state.current_standard = ""
-            st.session_state.mode = None
-
-    st.markdown("</div>", unsafe_allow_html=True)
+            reset_session_state()
+            st.rerun()
 
 
 if __name__ == "__main__":